@@ -1,9 +1,10 @@
 #!/usr/bin/env python3
-# A minimal Unix-like shell implemented with only os, sys, re.
+# A minimal Unix-like shell implemented with only os, sys, re and signal
+# (plus readline, if available, for interactive line editing).
 # Features:
 # - Prompt from $PS1 (default "$ ")
 # - PATH lookup (no execvp; uses execve)
-# - Foreground execution with wait; background (&) without wait
+# - Foreground execution with wait; background (&) reaped on SIGCHLD
 # - Builtins: exit, cd
 # - I/O redirection: "< infile", "> outfile"
 # - Simple pipelines: cmd1 | cmd2 [| cmd3 ...]
@@ -17,6 +18,7 @@
 import os
 import sys
 import re
+import signal
 import time
 
 # -----------------------------
@@ -31,31 +33,60 @@ def eprint(msg: str):
         # Best-effort; don't crash on logging.
         pass
 
+# PS1 is read once: the shell has no builtin that can change it.
+_PROMPT = os.environ.get("PS1", "$ ")
+_PROMPT_BYTES = _PROMPT.encode()
+
 def prompt_string() -> str:
-    return os.environ.get("PS1", "$ ")
+    return _PROMPT
 
 def print_prompt():
-    ps1 = prompt_string()
-    if ps1:
+    if _PROMPT_BYTES:
         try:
-            os.write(1, ps1.encode())
+            os.write(1, _PROMPT_BYTES)
         except Exception:
             pass
 
+# Unconsumed bytes read from a non-tty stdin
+_stdin_buf = b""
+# Whether stdin is a terminal; set once by main()
+_stdin_is_tty = False
+
+def read_line() -> str:
+    """
+    Print the prompt and read one line, like sys.stdin.readline(): the line
+    keeps its newline and '' means EOF. A terminal goes through input() so
+    GNU readline (if loaded) provides editing; other input is read with
+    os.read in 64 KiB chunks instead of one trip through Python's IO stack
+    per line.
+    """
+    global _stdin_buf
+    if _stdin_is_tty:
+        try:
+            return input(prompt_string()) + "\n"
+        except EOFError:
+            return ""
+    print_prompt()
+    while b"\n" not in _stdin_buf:
+        chunk = os.read(0, 65536)
+        if not chunk:
+            line, _stdin_buf = _stdin_buf, b""
+            return line.decode(errors="replace")
+        _stdin_buf += chunk
+    line, _, _stdin_buf = _stdin_buf.partition(b"\n")
+    return line.decode(errors="replace") + "\n"
+
 # -----------------------------
 # Parsing
 # -----------------------------
 
-_token_re = re.compile(
-    r"""
-    \s*(
-        '[^']*'                |   # single-quoted
-        "[^"]*"                |   # double-quoted
-        [^ \t\r\n'"]+              # bare token
-    )
-    """,
-    re.VERBOSE,
-)
+# Optional whitespace, then a bare token (the common case, tried first), a
+# single-quoted or a double-quoted string.
+_token_re = re.compile(r"""\s*([^ \t\r\n'"]+|'[^']*'|"[^"]*")""")
+
+# Quoted strings (an unterminated quote runs to end of line) or a pipe.
+# Unquoted text between them is skipped by finditer and never copied.
+_PIPE_SPLIT_RE = re.compile(r"""'[^']*'?|"[^"]*"?|\|""")
 
 def split_pipeline(line: str):
     """
@@ -63,78 +94,63 @@ def split_pipeline(line: str):
     Returns list[str] segments (trimmed).
     """
     segs = []
-    buf = []
-    in_s = False
-    in_d = False
-    i = 0
-    while i < len(line):
-        ch = line[i]
-        if ch == "'" and not in_d:
-            in_s = not in_s
-            buf.append(ch)
-        elif ch == '"' and not in_s:
-            in_d = not in_d
-            buf.append(ch)
-        elif ch == '|' and not in_s and not in_d:
-            segs.append(''.join(buf).strip())
-            buf = []
-        else:
-            buf.append(ch)
-        i += 1
-    if buf:
-        segs.append(''.join(buf).strip())
+    start = 0
+    for m in _PIPE_SPLIT_RE.finditer(line):
+        if m.group(0) == '|':
+            segs.append(line[start:m.start()].strip())
+            start = m.end()
+    segs.append(line[start:].strip())
     # Remove empty segments (e.g., stray pipes)
     return [s for s in segs if s != ""]
 
-def tokenize(cmd: str):
+def _unquote(tok: str) -> str:
+    if len(tok) >= 2 and ((tok[0] == "'" and tok[-1] == "'") or (tok[0] == '"' and tok[-1] == '"')):
+        return tok[1:-1]
+    return tok
+
+def _raw_tokens(cmd: str):
     """
-    Split a single pipeline stage into tokens (argv-like) honoring quotes.
-    Quotes are removed; no escape processing beyond quotes.
+    Yield quoted/bare tokens from _token_re. Characters no alternative matches
+    (e.g., an unterminated quote) come out as one-char tokens, best-effort.
     """
-    tokens = []
-    i = 0
-    while i < len(cmd):
-        m = _token_re.match(cmd, i)
-        if not m:
-            # skip any stray whitespace
-            if cmd[i].isspace():
-                i += 1
-                continue
-            # unknown char: treat as a one-char token (best-effort)
-            tokens.append(cmd[i])
-            i += 1
-            continue
-        tok = m.group(1)
-        i = m.end()
-        if len(tok) >= 2 and ((tok[0] == "'" and tok[-1] == "'") or (tok[0] == '"' and tok[-1] == '"')):
-            tok = tok[1:-1]
-        tokens.append(tok)
-    return tokens
-
-def parse_redirections(argv):
+    pos = 0
+    for m in _token_re.finditer(cmd):
+        for ch in cmd[pos:m.start()]:
+            if not ch.isspace():
+                yield ch
+        pos = m.end()
+        yield m.group(1)
+    for ch in cmd[pos:]:
+        if not ch.isspace():
+            yield ch
+
+def tokenize_and_parse(cmd: str):
     """
-    Parse simple redirections in argv: "< infile" and "> outfile".
+    Split a single pipeline stage into tokens (argv-like) honoring quotes, and
+    pull out simple redirections "< infile" and "> outfile" in the same pass.
     Returns (argv_wo_redirs, infile, outfile)
 
-    Only supports separated operators (e.g., 'ls > out', not 'ls>out').
+    Quotes are removed; no escape processing beyond quotes. Only separated
+    operators are recognized (e.g., 'ls > out', not 'ls>out').
     """
-    out = []
+    argv = []
     infile = None
     outfile = None
-    i = 0
-    L = len(argv)
-    while i < L:
-        t = argv[i]
-        if t == '<' and i + 1 < L:
-            infile = argv[i + 1]
-            i += 2
-        elif t == '>' and i + 1 < L:
-            outfile = argv[i + 1]
-            i += 2
+    it = _raw_tokens(cmd)
+    for tok in it:
+        if tok == '<' or tok == '>':
+            nxt = next(it, None)
+            if nxt is None:
+                # dangling operator: keep it as a plain word
+                argv.append(tok)
+                break
+            if tok == '<':
+                infile = _unquote(nxt)
+            else:
+                outfile = _unquote(nxt)
         else:
-            out.append(t)
-            i += 1
-    return out, infile, outfile
+            argv.append(_unquote(tok))
+    return argv, infile, outfile
 
 def parse_background(line: str):
     """
@@ -163,19 +179,46 @@ def is_executable(fp: str) -> bool:
     # Executable bit must be set; file must be regular or at least stat-able.
     return os.access(fp, os.X_OK)
 
+# Bash-style hash table: prog -> resolved path, valid while PATH is unchanged.
+_path_cache: dict[str, str] = {}
+_path_env_snapshot = None
+_path_dirs_cache: list[str] = []
+
+def _path_dirs():
+    """Return $PATH split into directories, re-splitting only when it changes
+    (which also invalidates the resolved-path cache)."""
+    global _path_env_snapshot, _path_dirs_cache
+    path = os.environ.get('PATH', '')
+    if path != _path_env_snapshot:
+        _path_env_snapshot = path
+        _path_dirs_cache = [d or '.' for d in path.split(':')]
+        _path_cache.clear()
+    return _path_dirs_cache
+
 def resolve_command(prog: str):
     """
     If prog includes '/', return as-is (relative/absolute).
     Otherwise search PATH. Return absolute/relative path string or None.
+    Hits found in absolute PATH directories are cached until PATH changes;
+    a cached hit is re-checked with a single access() syscall and rescanned
+    if it is no longer executable.
+    Only lookups made in the shell process itself fill the cache, so
+    run_pipeline resolves every stage before forking.
     """
     if '/' in prog:
         return prog if is_executable(prog) else None
-    path = os.environ.get('PATH', '')
-    for d in path.split(':'):
-        if not d:
-            d = '.'
+    dirs = _path_dirs()
+    cached = _path_cache.get(prog)
+    if cached is not None:
+        if os.access(cached, os.X_OK):
+            return cached
+        del _path_cache[prog]
+    for d in dirs:
         cand = os.path.join(d, prog)
         if is_executable(cand):
+            # Relative entries depend on the cwd, so only cache absolute ones
+            if os.path.isabs(d):
+                _path_cache[prog] = cand
             return cand
     return None
 
@@ -183,47 +226,79 @@ def resolve_command(prog: str):
 # Built-ins
 # -----------------------------
 
+def _bi_exit(argv):
+    # If an optional numeric argument is provided, use it
+    code = 0
+    if len(argv) > 1:
+        try:
+            code = int(argv[1])
+        except ValueError:
+            code = 1
+    sys.exit(code)
+
+def _bi_cd(argv):
+    # cd [path]; default to $HOME
+    path = None
+    if len(argv) >= 2:
+        path = argv[1]
+    else:
+        path = os.environ.get('HOME', None)
+    if path is None:
+        eprint("cd: HOME not set")
+        return 1
+    try:
+        os.chdir(path)
+        return 0
+    except OSError as e:
+        eprint(f"cd: {e}")
+        return 1
+
+# name -> handler(argv) returning an exit code
+_BUILTINS = {
+    'exit': _bi_exit,
+    'cd': _bi_cd,
+}
+
 def is_builtin(argv):
-    return len(argv) > 0 and argv[0] in ('exit', 'cd')
+    return len(argv) > 0 and argv[0] in _BUILTINS
 
 def run_builtin(argv):
     """
     Execute builtin in the current process. Returns an exit code int.
     """
-    if len(argv) == 0:
+    global _env_dirty
+    fn = _BUILTINS.get(argv[0]) if argv else None
+    if fn is None:
         return 0
-    cmd = argv[0]
-    if cmd == 'exit':
-        # If an optional numeric argument is provided, use it
-        code = 0
-        if len(argv) > 1:
-            try:
-                code = int(argv[1])
-            except ValueError:
-                code = 1
-        sys.exit(code)
-    elif cmd == 'cd':
-        # cd [path]; default to $HOME
-        path = None
-        if len(argv) >= 2:
-            path = argv[1]
-        else:
-            path = os.environ.get('HOME', None)
-        if path is None:
-            eprint("cd: HOME not set")
-            return 1
-        try:
-            os.chdir(path)
-            return 0
-        except OSError as e:
-            eprint(f"cd: {e}")
-            return 1
-    return 0
+    # Builtins run in the shell itself and may touch the environment
+    _env_dirty = True
+    return fn(argv)
 
 # -----------------------------
 # Execution
 # -----------------------------
 
+# Plain-dict copy of os.environ handed to every child, refreshed only after
+# a builtin has run (the only way this shell can change its environment).
+_env_snapshot = dict(os.environ)
+_env_dirty = False
+
+def child_env():
+    global _env_snapshot, _env_dirty
+    if _env_dirty:
+        _env_snapshot = dict(os.environ)
+        _env_dirty = False
+    return _env_snapshot
+
+# Descriptors opened by the shell are close-on-exec; dup2 onto 0/1 yields an
+# inheritable copy, so children never need to close the originals by hand.
+_O_CLOEXEC = getattr(os, "O_CLOEXEC", 0)
+
+def make_pipe():
+    if hasattr(os, "pipe2"):
+        return os.pipe2(_O_CLOEXEC)
+    return os.pipe()  # non-inheritable by default (PEP 446)
+
 def setup_redirection(infile, outfile):
     """
     In child: apply redirections using dup2. Return True on success, False otherwise.
@@ -231,37 +306,31 @@ def setup_redirection(infile, outfile):
     # input redirection
     if infile is not None:
         try:
-            fd = os.open(infile, os.O_RDONLY)
+            fd = os.open(infile, os.O_RDONLY | _O_CLOEXEC)
         except OSError as e:
             eprint(f"{infile}: {e}")
             return False
-        try:
-            os.dup2(fd, 0)
-        finally:
-            os.close(fd)
+        os.dup2(fd, 0)
     # output redirection
     if outfile is not None:
         try:
-            fd = os.open(outfile, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o666)
+            fd = os.open(outfile, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | _O_CLOEXEC, 0o666)
         except OSError as e:
             eprint(f"{outfile}: {e}")
             return False
-        try:
-            os.dup2(fd, 1)
-        finally:
-            os.close(fd)
+        os.dup2(fd, 1)
     return True
 
-def exec_program(argv, env):
+def exec_program(argv, env, path):
     """
-    In child: resolve argv[0] to a path, then execve. On failure, print required
-    message and exit with status 127 (like many shells).
+    In child: execve argv using path, which the parent resolved from argv[0]
+    (None if not found). On failure, print required message and exit with
+    status 127 (like many shells).
     """
     if len(argv) == 0:
         os._exit(0)
 
     prog = argv[0]
-    path = resolve_command(prog)
     if path is None:
         eprint(f"{prog}: command not found")
         os._exit(127)
@@ -273,6 +342,27 @@ def exec_program(argv, env):
         eprint(f"{prog}: {e}")
         os._exit(126)
 
+def spawn_program(argv, infile, outfile, env):
+    """
+    Fast path for a single external command (argv must be non-empty):
+    posix_spawn avoids copying the parent's address space the way fork() does.
+    Returns the child pid, or None when the caller should fall back to
+    fork+exec (which also reports errors).
+    """
+    path = resolve_command(argv[0])
+    if path is None:
+        return None
+    actions = []
+    if infile is not None:
+        actions.append((os.POSIX_SPAWN_OPEN, 0, infile, os.O_RDONLY, 0))
+    if outfile is not None:
+        actions.append((os.POSIX_SPAWN_OPEN, 1, outfile,
+                        os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o666))
+    try:
+        return os.posix_spawn(path, argv, env, file_actions=actions)
+    except OSError:
+        return None
+
 def run_pipeline(stages, is_background):
     """
     Run a list of pipeline stages. Each stage is a dict:
@@ -301,76 +391,103 @@ def run_pipeline(stages, is_background):
                 os._exit(code)
             else:
                 if is_background:
-                    # Do not wait; return 0 for parent
+                    # Do not wait; the SIGCHLD handler reaps it
+                    track_background([pid])
                     return 0
                 _, status = os.waitpid(pid, 0)
                 return status_to_exitcode(status)
 
-    # For N>=1 external commands, build N-1 pipes
-    pipes = []
-    for _ in range(n - 1):
-        pipes.append(os.pipe())
-
+    # Single foreground external command: try posix_spawn before forking.
+    # A redirect-only stage (empty argv) still goes through fork below.
+    if n == 1 and stages[0]["argv"] and not is_background and hasattr(os, "posix_spawn"):
+        st = stages[0]
+        pid = spawn_program(st["argv"], st["in"], st["out"], child_env())
+        if pid is not None:
+            _, status = os.waitpid(pid, 0)
+            return status_to_exitcode(status)
+
+    # For N>=1 external commands, create each pipe just before forking the
+    # stage that writes to it. The parent closes every end as soon as its
+    # children hold it; children leave theirs to close-on-exec.
+    env = child_env()
     pids = []
+    prev_read = None
 
     for i, st in enumerate(stages):
+        if i < n - 1:
+            pr, pw = make_pipe()
+        else:
+            pr = pw = None
+        # Resolve in the parent so the PATH cache is filled and reused
+        path = resolve_command(st["argv"][0]) if st["argv"] else None
         pid = os.fork()
         if pid == 0:
             # Child
             # If not first stage, connect stdin to previous pipe's read end
-            if i > 0:
-                pr, pw = pipes[i - 1]
-                os.dup2(pr, 0)
+            if prev_read is not None:
+                os.dup2(prev_read, 0)
             # If not last stage, connect stdout to this pipe's write end
-            if i < n - 1:
-                pr, pw = pipes[i]
+            # (the original pipe fds are close-on-exec)
+            if pw is not None:
                 os.dup2(pw, 1)
 
-            # Close all pipe fds in child
-            for j, (prj, pwj) in enumerate(pipes):
-                try:
-                    os.close(prj)
-                except OSError:
-                    pass
-                try:
-                    os.close(pwj)
-                except OSError:
-                    pass
-
             # Handle redirections for this stage (leftmost/rightmost are typical; we honor per-stage)
             if not setup_redirection(st["in"], st["out"]):
                 os._exit(1)
 
             # Exec program
-            exec_program(st["argv"], os.environ)
+            exec_program(st["argv"], env, path)
 
             # Should never return
             os._exit(127)
         else:
             pids.append(pid)
-
-    # Parent: close all pipe fds
-    for pr, pw in pipes:
-        try:
-            os.close(pr)
-        except OSError:
-            pass
-        try:
-            os.close(pw)
-        except OSError:
-            pass
-
-    # Background: do not wait
+            # Parent: the previous read end now belongs to this child, and
+            # this write end to the child just forked.
+            if prev_read is not None:
+                os.close(prev_read)
+            if pw is not None:
+                os.close(pw)
+            prev_read = pr
+
+    # Background: do not wait; the SIGCHLD handler reaps them
     if is_background:
+        track_background(pids)
         return 0
 
-    # Foreground: wait for all; return last one's exit code
-    last_status = 0
-    for pid in pids:
-        _, status = os.waitpid(pid, 0)
-        last_status = status if pid == pids[-1] else last_status
+    # Foreground: reap stages in whatever order they exit; return the last
+    # stage's exit code
+    remaining = set(pids)
+    results = {}
+    while remaining:
+        pid, status = os.waitpid(-1, 0)
+        if pid in remaining:
+            results[pid] = status
+            remaining.discard(pid)
+        else:
+            # a background child finished meanwhile; it's reaped now
+            _bg_pids.discard(pid)
+
+    return status_to_exitcode(results[pids[-1]])
 
-    return status_to_exitcode(last_status)
+# Background children not yet reaped. Foreground children are waited for
+# explicitly, so the handler only ever touches these pids.
+_bg_pids = set()
+
+def reap_background(signum=None, frame=None):
+    """SIGCHLD handler: reap any finished background children (no zombies)."""
+    for pid in list(_bg_pids):
+        try:
+            done, _ = os.waitpid(pid, os.WNOHANG)
+        except ChildProcessError:
+            done = pid
+        if done:
+            _bg_pids.discard(pid)
+
+def track_background(pids):
+    _bg_pids.update(pids)
+    # A child may have exited before it was tracked; catch up now.
+    reap_background()
 
 def status_to_exitcode(status: int) -> int:
     """Translate os.waitpid status to a shell-like exit code."""
@@ -398,11 +515,10 @@ def parse_line_into_stages(line: str):
     segs = split_pipeline(line2)
     stages = []
     for seg in segs:
-        argv = tokenize(seg)
+        argv, infile, outfile = tokenize_and_parse(seg)
         # ignore empty command parts
-        if len(argv) == 0:
+        if len(argv) == 0 and infile is None and outfile is None:
             continue
-        argv, infile, outfile = parse_redirections(argv)
         stages.append({"argv": argv, "in": infile, "out": outfile})
     return stages, is_bg
 
@@ -422,13 +538,20 @@ def show_banner():
 def main():
     # Make stdin/stdout/stderr unbuffered behavior consistent
     # (We will interact via os.read/os.write only when needed.)
+    global _stdin_is_tty
+    _stdin_is_tty = os.isatty(0)
+    if _stdin_is_tty:
+        try:
+            import readline  # line editing and history for input()
+        except ImportError:
+            pass
     show_banner()
+    signal.signal(signal.SIGCHLD, reap_background)
     while True:
         try:
-            # Print prompt (PS1 may be empty; that's OK)
-            print_prompt()
-            # Read one line; EOF terminates
-            line = sys.stdin.readline()
+            # Prompt and read one line (PS1 may be empty; that's OK);
+            # EOF terminates
+            line = read_line()
             if line == '':
                 # EOF
                 break
@@ -12,91 +12,186 @@ Supports:
 - list   (t): show archive contents
 - extract(x): extract files
 
-Archive format (text-based, very simple):
-  path\n
-  size\n
-  mode\n
-  mtime\n
-  raw-bytes (size bytes)
-  ----END----\n
+Archive format (binary, little-endian):
+  magic "TRZ2" (4 bytes), then per entry:
+    header: pathlen u32, size u64, mode u32, mtime i64 (24 bytes)
+    path (pathlen bytes, utf-8)
+    raw-bytes (size bytes)
 """
 
-import os, sys, stat, time
+import os, sys, stat, time, struct
 
-SEP = b"----END----\n"
+MAGIC = b"TRZ2"
+# pathlen, size, mode, mtime
+_HDR = struct.Struct("<IQIq")
 
-def write_file_entry(archive, path, arcname):
-    st = os.stat(path)
+# Files below this size go out with their header in a single writev
+SMALL_FILE = 64 * 1024
+
+# Reused across entries when sendfile isn't available
+_COPY_BUF = bytearray(1 << 20)
+
+def write_all(fd, bufs):
+    """writev bufs to fd, retrying on short writes."""
+    bufs = [memoryview(b) for b in bufs if len(b)]
+    while bufs:
+        n = os.writev(fd, bufs)
+        while bufs and n >= len(bufs[0]):
+            n -= len(bufs[0])
+            bufs.pop(0)
+        if bufs:
+            bufs[0] = bufs[0][n:]
+
+def copy_data(out_fd, f, size):
+    """Copy size bytes from file f to out_fd, in-kernel when possible."""
+    if hasattr(os, "sendfile"):
+        in_fd = f.fileno()
+        offset = 0
+        while offset < size:
+            sent = os.sendfile(out_fd, in_fd, offset, size - offset)
+            if sent == 0:
+                raise IOError("file shrank while archiving")
+            offset += sent
+        return
+    mv = memoryview(_COPY_BUF)
+    remaining = size
+    while remaining:
+        n = f.readinto(mv[:min(len(mv), remaining)])
+        if not n:
+            raise IOError("file shrank while archiving")
+        write_all(out_fd, [mv[:n]])
+        remaining -= n
+
+def advise_sequential(f):
+    """Hint the kernel to read ahead aggressively on f."""
+    if hasattr(os, "posix_fadvise"):
+        try:
+            os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+        except OSError:
+            pass
+
+def write_file_entry(archive_fd, path, arcname, st=None):
+    if st is None:
+        st = os.stat(path)
     size = st.st_size
     mode = st.st_mode
     mtime = int(st.st_mtime)
 
+    name = arcname.encode()
+    hdr = _HDR.pack(len(name), size, mode, mtime) + name
     with open(path, "rb") as f:
-        data = f.read()
+        if size < SMALL_FILE:
+            data = f.read(size)
+            if len(data) < size:
+                raise IOError("file shrank while archiving")
+            write_all(archive_fd, [hdr, data])
+        else:
+            write_all(archive_fd, [hdr])
+            copy_data(archive_fd, f, size)
 
-    hdr = f"{arcname}\n{size}\n{mode}\n{mtime}\n".encode()
-    archive.write(hdr)
-    archive.write(data)
-    archive.write(SEP)
+def scan_files(top):
+    """Yield a DirEntry for every non-directory under top (like os.walk,
+    directory symlinks are not descended into or archived, and unreadable
+    directories are silently skipped)."""
+    try:
+        it = os.scandir(top)
+    except OSError:
+        return
+    with it:
+        for entry in it:
+            if entry.is_dir():
+                if not entry.is_symlink():
+                    yield from scan_files(entry.path)
+            else:
+                yield entry
 
 def create(archname, files):
-    with open(archname, "wb") as a:
+    a = os.open(archname, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o666)
+    try:
+        write_all(a, [MAGIC])
         for f in files:
             if os.path.isdir(f):
-                for root, dirs, fls in os.walk(f):
-                    for name in fls:
-                        full = os.path.join(root, name)
-                        rel = os.path.relpath(full, start=os.path.dirname(f))
-                        print(f"Adding {rel}")
-                        write_file_entry(a, full, rel)
+                for entry in scan_files(f):
+                    rel = os.path.relpath(entry.path, start=os.path.dirname(f))
+                    print(f"Adding {rel}")
+                    write_file_entry(a, entry.path, rel, entry.stat())
             else:
                 rel = os.path.basename(f)
                 print(f"Adding {rel}")
                 write_file_entry(a, f, rel)
+    finally:
+        os.close(a)
+
+def iter_entries(a):
+    """
+    Yield (path, size, mode, mtime, data_offset) for each archive entry,
+    leaving a positioned at the next header. Stops on EOF or corruption.
+    """
+    if a.read(len(MAGIC)) != MAGIC:
+        print("Not a tarz archive (or an old text-format one)", file=sys.stderr)
+        return
+    archsize = os.fstat(a.fileno()).st_size
+    while True:
+        hdr = a.read(_HDR.size)
+        if not hdr:
+            return
+        if len(hdr) < _HDR.size:
+            print("Archive corruption detected!", file=sys.stderr)
+            return
+        pathlen, size, mode, mtime = _HDR.unpack(hdr)
+        path = a.read(pathlen)
+        start = a.tell()
+        if len(path) < pathlen or start + size > archsize:
+            print("Archive corruption detected!", file=sys.stderr)
+            return
+        # skip data
+        a.seek(size, os.SEEK_CUR)
+        yield path.decode(), size, mode, mtime, start
 
 def list_contents(archname):
     with open(archname, "rb") as a:
-        while True:
-            header = []
-            for _ in range(4):
-                line = a.readline()
-                if not line:
-                    return
-                header.append(line.decode().rstrip("\n"))
-            path, size, mode, mtime = header
-            size = int(size)
-            mode = int(mode)
-            mtime = int(mtime)
-            # skip data
-            a.read(size)
-            sep = a.readline()
-            if sep != SEP:
-                print("Archive corruption detected!", file=sys.stderr)
-                return
+        advise_sequential(a)
+        for path, size, mode, mtime, _ in iter_entries(a):
             print(f"{path}\t{size} bytes\tmode={oct(mode)}\tmtime={time.ctime(mtime)}")
 
+def extract_data(a, out, start, size):
+    """Copy size bytes at offset start in archive a into out."""
+    if hasattr(os, "sendfile"):
+        out_fd, in_fd = out.fileno(), a.fileno()
+        offset = start
+        end = start + size
+        while offset < end:
+            sent = os.sendfile(out_fd, in_fd, offset, end - offset)
+            if sent == 0:
+                raise IOError("archive truncated")
+            offset += sent
+        return
+    # Stream through the shared buffer rather than allocating size bytes
+    pos = a.tell()
+    a.seek(start)
+    mv = memoryview(_COPY_BUF)
+    remaining = size
+    while remaining:
+        n = a.readinto(mv[:min(len(mv), remaining)])
+        if not n:
+            raise IOError("archive truncated")
+        out.write(mv[:n])
+        remaining -= n
+    a.seek(pos)
+
 def extract(archname):
     with open(archname, "rb") as a:
-        while True:
-            header = []
-            for _ in range(4):
-                line = a.readline()
-                if not line:
-                    return
-                header.append(line.decode().rstrip("\n"))
-            path, size, mode, mtime = header
-            size = int(size)
-            mode = int(mode)
-            mtime = int(mtime)
-            data = a.read(size)
-            sep = a.readline()
-            if sep != SEP:
-                print("Archive corruption detected!", file=sys.stderr)
-                return
+        advise_sequential(a)
+        # Parent dirs already created ('' is the cwd itself)
+        made = {""}
+        for path, size, mode, mtime, start in iter_entries(a):
             # Recreate file
-            os.makedirs(os.path.dirname(path), exist_ok=True)
+            parent = os.path.dirname(path)
+            if parent not in made:
+                os.makedirs(parent, exist_ok=True)
+                made.add(parent)
             with open(path, "wb") as out:
-                out.write(data)
+                extract_data(a, out, start, size)
             os.chmod(path, mode)
             os.utime(path, (mtime, mtime))
             print(f"Extracted {path}")